@@ -5,127 +5,247 @@
 
 import os
 import sys
+import errno
+import stat
 import shutil
 import re
-from SystemdUnitParser import SystemdUnitParser
 import subprocess
 import tempfile
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Messages above this kernel log level are dropped without being formatted
+try:
+    _LOG_THRESHOLD = int(os.environ.get("MULTIQUADLET_LOG_LEVEL", "6"))
+except ValueError:
+    _LOG_THRESHOLD = 6
+
+# Per-file work is IO bound, so use more threads than CPUs
+_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+
+_SEP_RE = re.compile(rb"^--- (.+) ---$")
+_SECTION_RE = re.compile(r"^[ \t]*\[([^\]\n]+)\][ \t]*$", re.M)
+_INSTALL_RE = re.compile(r"^[ \t]*(WantedBy|RequiredBy|UpheldBy)[ \t]*=[ \t]*(.*?)[ \t]*$", re.M)
+_SOURCEPATH_RE = re.compile(r"^[ \t]*SourcePath=.*$", re.M)
+_UNIT_HEADER_RE = re.compile(r"^[ \t]*\[Unit\][ \t]*$", re.M)
+
+_QUADLET_EXTENSIONS = frozenset({'.container', '.network', '.volume', '.pod'})
+# Suffix podman's quadlet generator appends to the unit name for each quadlet type
+_PODMAN_SERVICE_SUFFIXES = {
+    '.container': '',
+    '.pod':       '-pod',
+    '.kube':      '-kube',
+    '.network':   '-network',
+    '.volume':    '-volume',
+    '.image':     '-image',
+    '.build':     '-build',
+}
+# Kept as a tuple so it can be passed straight to str.endswith()
+_SYSTEMD_UNIT_EXTENSIONS = ('.target', '.socket', '.service', '.timer')
+
+def log_with_level(level, message, *args):
+    """Logs a message with a specified kernel log level.
+
+    The message is %-formatted with args only if the level is enabled by MULTIQUADLET_LOG_LEVEL.
+    """
+    if level > _LOG_THRESHOLD:
+        return
+    if args:
+        message = message % args
+    # Single write so lines from worker threads don't interleave
+    sys.stdout.write(f"multiquadlet_gen[{level}]: {message}\n")
+
+def fast_copy(src, dst):
+    """Copies a regular file and its permission bits, letting the kernel move the data when possible."""
+    if hasattr(os, 'copy_file_range'):
+        sfd = os.open(src, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            st = os.fstat(sfd)
+            dfd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC, 0o600)
+            try:
+                # A zero size or a first call that moves nothing (procfs, some FUSE/NFS mounts) means the
+                # size can't be trusted, so leave those to the plain copy below
+                remaining = st.st_size
+                copied = os.copy_file_range(sfd, dfd, remaining) if remaining > 0 else 0
+                if copied > 0:
+                    remaining -= copied
+                    while remaining > 0:
+                        copied = os.copy_file_range(sfd, dfd, remaining)
+                        if copied == 0:
+                            raise OSError(errno.EIO, f"Short copy, {remaining} bytes missing from '{src}'", dst)
+                        remaining -= copied
+                    # Mode goes on last, a read-only source must not make dst unwritable before the data is in
+                    os.fchmod(dfd, stat.S_IMODE(st.st_mode))
+                    return
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+            finally:
+                os.close(dfd)
+        finally:
+            os.close(sfd)
+    shutil.copyfile(src, dst)
+    shutil.copymode(src, dst)
+
+def copy_tree(src_dir, dst_dir, hardlink=None):
+    """Copies a directory tree, recreating symlinks as symlinks and merging into existing directories.
+
+    Regular files are hardlinked instead of copied when both trees are on the same filesystem.
+    """
+    os.makedirs(dst_dir, exist_ok=True)
+    if hardlink is None:
+        hardlink = os.stat(src_dir).st_dev == os.stat(dst_dir).st_dev
+    with os.scandir(src_dir) as it:
+        for entry in it:
+            dst_path = os.path.join(dst_dir, entry.name)
+            if entry.is_symlink():
+                os.symlink(os.readlink(entry.path), dst_path)
+            elif entry.is_dir():
+                copy_tree(entry.path, dst_path, hardlink)
+            else:
+                if hardlink:
+                    try:
+                        os.link(entry.path, dst_path)
+                        continue
+                    except OSError:
+                        pass # e.g. destination already exists, overwrite it with a copy
+                fast_copy(entry.path, dst_path)
+
+def match_separator(line):
+    """Returns the output file name if the raw line is a '--- name ---' separator, None otherwise."""
+    # Cheap literal checks first, most lines are not separators
+    if not line.startswith(b'--- '):
+        return None
+    line = line.rstrip(b'\r\n')
+    if not line.endswith(b' ---'):
+        return None
+    match = _SEP_RE.match(line)
+    return os.fsdecode(match.group(1)) if match else None
 
-def log_with_level(level, message):
-    """Logs a message with a specified kernel log level."""
-    print(f"multiquadlet_gen[{level}]: {message}")
-
+@functools.lru_cache(maxsize=1024)
 def get_quadlet_service_filename(fname):
     just_name, extension = os.path.splitext(fname)
-    if extension == '.container':
-        return f"{just_name}.service"
-    elif extension in ['.pod', '.kube', '.network', '.volume', '.image', '.build']:
-        file_type = extension[1:]
-        return f"{just_name}-{file_type}.service"
-    elif extension in ['.target', '.socket', '.service', '.timer']:
+    suffix = _PODMAN_SERVICE_SUFFIXES.get(extension)
+    if suffix is not None:
+        return f"{just_name}{suffix}.service"
+    elif extension in _SYSTEMD_UNIT_EXTENSIONS:
         return fname
     else:
-        log_with_level(3, f"Error: Unknown file type {fname} while trying to figure out service name. Skipping.")
+        log_with_level(3, "Error: Unknown file type %s while trying to figure out service name. Skipping.", fname)
         return None
 
 def update_source_path(f, source_file):
-    if not os.path.isfile(f):
-        log_with_level(3, f"Error: Intermediate quadlet generated file not found: {f}. Skipping.")
-        return True
-
-    config = SystemdUnitParser()
-    try:
-        config.read(f)
-    except Exception as e:
-        print(f"Error: Failed to parse '{f}': {e}", file=sys.stderr)
-        log_with_level(3, f"Error: failed to parse file {f}")
-        return True
-
-    source_path_present = config.get('Unit', 'SourcePath', fallback=None)
-
-    infile = os.path.basename(f)
-    content = []
-    
     try:
         with open(f, 'r') as fr:
-            lines = fr.read().splitlines()
-        for line in lines:
-            if source_path_present:
-                match = re.match(r"^\s*SourcePath=.*", line)
-                if match:
-                    content.append(f"SourcePath={source_file}")
-                    log_with_level(6, f"Updated 'SourcePath={source_file}' in {f}")
-                else:
-                    content.append(line)
-            else:
-                content.append(line)
-                match = re.match(r"^\s*\[Unit\]\s*", line)
-                if match:
-                    content.append(f"SourcePath={source_file}")
-                    log_with_level(6, f"Inserted 'SourcePath={source_file}' in '{f}'")
-        with open(f, 'w') as fw:
-            fw.write('\n'.join(content))
-            fw.write('\n')
-    except IOError as e:
-        log_with_level(3, f"Error: Cannot process input file '{f}', skipping: {e}")
+            text = fr.read()
+            mode = stat.S_IMODE(os.fstat(fr.fileno()).st_mode)
+        count = 0
+        if 'SourcePath=' in text:
+            text, count = _SOURCEPATH_RE.subn(lambda m: f"SourcePath={source_file}", text)
+        if count:
+            log_with_level(6, "Updated 'SourcePath=%s' in %s", source_file, f)
+        else:
+            text, count = _UNIT_HEADER_RE.subn(lambda m: f"{m.group(0)}\nSourcePath={source_file}", text)
+            if count:
+                log_with_level(6, "Inserted 'SourcePath=%s' in '%s'", source_file, f)
+        if count:
+            # Write a sibling file and rename it over the original, so the unit is never seen half-written
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(f), prefix='.src_')
+            try:
+                with os.fdopen(fd, 'w') as fw:
+                    os.fchmod(fw.fileno(), mode)
+                    fw.write(text)
+                os.replace(tmp_path, f)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+    except FileNotFoundError:
+        log_with_level(3, "Error: Intermediate quadlet generated file not found: %s. Skipping.", f)
+        return True
+    except (OSError, UnicodeDecodeError) as e:
+        log_with_level(3, "Error: Cannot process input file '%s', skipping: %s", f, e)
         return True 
 
 def process_unit_install_section(normal_dir, unit_name):
     """Parses a systemd file and creates symlinks based on its [Install] section."""
     intermediate_unit_file = os.path.join(normal_dir, unit_name)
 
-    if not os.path.isfile(intermediate_unit_file):
-        log_with_level(3, f"Error: Intermediate unit file not found: {intermediate_unit_file}. Skipping.")
-        return True
-
-    config = SystemdUnitParser()
     try:
-        config.read(intermediate_unit_file)
-    except Exception as e:
-        print(f"Error: Failed to parse '{intermediate_unit_file}': {e}", file=sys.stderr)
-        log_with_level(3, f"Error: failed to parse file {intermediate_unit_file}")
+        with open(intermediate_unit_file, 'r') as fr:
+            text = fr.read()
+    except FileNotFoundError:
+        log_with_level(3, "Error: Intermediate unit file not found: %s. Skipping.", intermediate_unit_file)
+        return True
+    except (OSError, UnicodeDecodeError) as e:
+        log_with_level(3, "Error: failed to read file %s: %s", intermediate_unit_file, e)
         return False
 
-    if 'Install' not in config:
-        log_with_level(6, f"No [Install] section found in {unit_name}. Skipping.")
+    # Only the [Install] keys are needed, so scan for them directly instead of parsing the whole unit.
+    # Most units have no [Install] section at all, a plain substring search rules those out cheaply.
+    install_spans = []
+    if '[Install]' in text:
+        sections = list(_SECTION_RE.finditer(text))
+        install_spans = [(m.end(), sections[i + 1].start() if i + 1 < len(sections) else len(text))
+                         for i, m in enumerate(sections) if m.group(1) == 'Install']
+    if not install_spans:
+        log_with_level(6, "No [Install] section found in %s. Skipping.", unit_name)
         return True
 
+    # Targets are kept as dict keys, which dedupes repeated entries while preserving their order
     dependencies = {
-        "wants":    config.get('Install', 'WantedBy', fallback=None),
-        "requires": config.get('Install', 'RequiredBy', fallback=None),
-        "upholds":  config.get('Install', 'UpheldBy', fallback=None)
+        "WantedBy":   ("wants", {}),
+        "RequiredBy": ("requires", {}),
+        "UpheldBy":   ("upholds", {})
     }
+    for start, end in install_spans:
+        for match in _INSTALL_RE.finditer(text, start, end):
+            dependencies[match.group(1)][1].update(dict.fromkeys(match.group(2).split()))
 
-    for dep_type, dep_list in dependencies.items():
-        targets = []
-        if not dep_list:
-            continue
-        elif isinstance(dep_list, str):
-            targets = dep_list.split()
-        else:
-            targets = sum([v.split() for v in dep_list],targets)
-
-        log_with_level(6, f"Installing {unit_name} as type={dep_type} for target units = {targets}")
-        for target in targets:
-            symlink_dir = os.path.join(normal_dir, f"{target}.{dep_type}")
-            symlink_path = os.path.join(symlink_dir, unit_name)
+    # Resolve every symlink relative to one directory fd instead of walking the full path each time
+    try:
+        normal_fd = os.open(normal_dir, os.O_RDONLY | os.O_DIRECTORY | os.O_CLOEXEC)
+    except OSError as e:
+        log_with_level(3, "Error opening directory %s: %s", normal_dir, e)
+        return False
 
-            try:
-                os.makedirs(symlink_dir, exist_ok=True)
-                relative_target_path = os.path.relpath(os.path.join(normal_dir, unit_name), symlink_dir)
-                os.symlink(relative_target_path, symlink_path)
-                log_with_level(6, f"Created symlink: {symlink_path} -> {relative_target_path} (type: {dep_type})")
-            except FileExistsError:
-                log_with_level(7, f"Symlink already exists at {symlink_path}.")
-            except OSError as e:
-                log_with_level(3, f"Error creating symlink {symlink_path}: {e}")
-                return False
-    
-    log_with_level(6, f"Finished processing Install section for {unit_name}")
+    try:
+        for dep_type, targets in dependencies.values():
+            if not targets:
+                continue
+            log_with_level(6, "Installing %s as type=%s for target units = %s", unit_name, dep_type, list(targets))
+            relative_target_path = f"../{unit_name}"
+            for target in targets:
+                symlink_dir = f"{target}.{dep_type}"
+                symlink_name = f"{symlink_dir}/{unit_name}"
+
+                try:
+                    try:
+                        os.mkdir(symlink_dir, dir_fd=normal_fd)
+                    except FileExistsError:
+                        pass
+                    os.symlink(relative_target_path, symlink_name, dir_fd=normal_fd)
+                    log_with_level(6, "Created symlink: %s/%s -> %s (type: %s)", normal_dir, symlink_name, relative_target_path, dep_type)
+                except FileExistsError:
+                    log_with_level(7, "Symlink already exists at %s/%s.", normal_dir, symlink_name)
+                except OSError as e:
+                    log_with_level(3, "Error creating symlink %s/%s: %s", normal_dir, symlink_name, e)
+                    return False
+    finally:
+        os.close(normal_fd)
+
+    log_with_level(6, "Finished processing Install section for %s", unit_name)
     return True
 
+def install_generated_unit(interimdir, gendir, fname, source_file):
+    """Fixes up SourcePath of a generated native unit, copies it to gendir and installs its symlinks."""
+    update_source_path(os.path.join(interimdir, fname), source_file)
+    log_with_level(6, "Copying '%s' to '%s'...", fname, gendir)
+    fast_copy(os.path.join(interimdir, fname), os.path.join(gendir, fname))
+    return process_unit_install_section(gendir, fname)
+
 def main():
     """Main function to orchestrate the script's execution."""
+    script_name = os.path.basename(__file__)
     systemd_scope = os.environ.get("SYSTEMD_SCOPE")
     if systemd_scope == "user":
         xdg_runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
@@ -137,73 +257,104 @@ def main():
         input_dir = os.path.abspath("/etc/containers/multiquadlet")
 
     if not len(sys.argv) > 1:
-        log_with_level(3, f"Error: Must be run as: {os.path.basename(__file__)} gendir [gendir-early] [gendir-late]")
+        log_with_level(3, "Error: Must be run as: %s gendir [gendir-early] [gendir-late]", script_name)
     gendir = sys.argv[1]
 
     if not os.path.isdir(input_dir):
-        log_with_level(4, f"Warning: Input directory '{input_dir}' does not exist. Skipping multiquadlet processing.")
+        log_with_level(4, "Warning: Input directory '%s' does not exist. Skipping multiquadlet processing.", input_dir)
         sys.exit(0)
 
     interim_top_dir = tempfile.TemporaryDirectory(prefix='multiquadlet_gen_')
     interimdir = os.path.join(interim_top_dir.name, "multiquadlet_interim")
     os.makedirs(interimdir, exist_ok=True)
-    log_with_level(6, f"Using temporary directory for intermediate quadet files: {interimdir}")
+    log_with_level(6, "Using temporary directory for intermediate quadet files: %s", interimdir)
 
     source_file_map = {}
 
-    # Copy files
-    try:
-        files_to_copy = [f for f in os.listdir(input_dir) if re.match(r".*\.(container|network|volume|pod)$", f)]
-        for f in files_to_copy:
-            infile = os.path.join(input_dir, f)
-            shutil.copy(infile, interimdir)
-            source_file_map[get_quadlet_service_filename(f)] = infile
-    except FileNotFoundError:
-        pass
+    # Classify input files in a single directory pass
+    files_to_copy = []
+    multiquadlet_files = []
+    with os.scandir(input_dir) as it:
+        for entry in it:
+            extension = os.path.splitext(entry.name)[1]
+            if extension in _QUADLET_EXTENSIONS and entry.is_file():
+                files_to_copy.append(entry.name)
+            elif extension == '.multiquadlet' and entry.is_file():
+                multiquadlet_files.append(entry.name)
 
+    # Copy files
+    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+        copies = {executor.submit(fast_copy, os.path.join(input_dir, f), os.path.join(interimdir, f)): f for f in files_to_copy}
+        for future in as_completed(copies):
+            f = copies[future]
+            try:
+                future.result()
+            except FileNotFoundError:
+                log_with_level(4, "Warning: Input file '%s' disappeared while copying it. Skipping.", os.path.join(input_dir, f))
+                continue
+            source_file_map[get_quadlet_service_filename(f)] = os.path.join(input_dir, f)
 
     # Process multiquadlet files
-    for infile in [f for f in os.listdir(input_dir) if f.endswith('.multiquadlet')]:
-        log_with_level(6, f"Processing input file: {infile}")
+    for infile in multiquadlet_files:
+        log_with_level(6, "Processing input file: %s", infile)
         input_path = os.path.join(input_dir, infile)
-        files_generated_content = {}
         try:
-            with open(input_path, 'r') as f:
-                lines = f.read().splitlines()
-            current_content = []
-            current_fname = None
+            # First pass only collects output names, so nothing is written if any of them clashes
+            generated_fnames = set()
             skip_file = False
-            for line in lines:
-                match = re.match(r"^---\ (.+)\ ---$", line)
-                if match:
-                    current_fname=match.group(1)
+            warned_leading_content = False
+            with open(input_path, 'rb') as f:
+                for lineno, line in enumerate(f, start=1):
+                    current_fname = match_separator(line)
+                    if current_fname is None:
+                        # Content before the first separator belongs to no output file
+                        if not generated_fnames and not warned_leading_content and line.strip():
+                            log_with_level(4, "Warning: Ignoring content before the first '--- <filename> ---' separator in '%s' (line %d).", infile, lineno)
+                            warned_leading_content = True
+                        continue
                     output_path = os.path.join(interimdir, current_fname)
-                    if current_fname in files_generated_content.keys() or os.path.exists(output_path):
-                        log_with_level(3, f"Error: Output file '{output_path}' already exists before processing '{infile}'. Skipping '{infile}' altogether.")
+                    if current_fname in generated_fnames or os.path.exists(output_path):
+                        log_with_level(3, "Error: Output file '%s' already exists before processing '%s'. Skipping '%s' altogether.", output_path, infile, infile)
                         skip_file = True
                         break
-                    else:
-                        files_generated_content[current_fname] = []
-                else:
-                    files_generated_content[current_fname].append(line)
+                    generated_fnames.add(current_fname)
 
             if skip_file:
                 continue
 
-            if len(files_generated_content) > 0:
-                log_with_level(6, f"Generated files from {infile}:")
-                for fname in files_generated_content.keys():
-                    output_path = os.path.join(interimdir, fname)
-                    with open(output_path, 'w') as fw:
-                        fw.write(f"# Automatically generated by {os.path.basename(__file__)} from {os.path.basename(infile)}\n")
-                        fw.write('\n'.join(files_generated_content[fname]))
-                        fw.write('\n')
-                    log_with_level(6, f"  {output_path}")
-                    source_file_map[get_quadlet_service_filename(fname)] = input_path
-            else:
-                log_with_level(6, f"No files generated from {infile}.")
+            if not generated_fnames:
+                log_with_level(6, "No files generated from %s.", infile)
+                continue
+
+            # Second pass streams each section straight into its output file. Lines are copied as raw
+            # bytes so they aren't decoded and re-encoded on the way through.
+            log_with_level(6, "Generated files from %s:", infile)
+            header = f"# Automatically generated by {script_name} from {infile}\n".encode()
+            fw = None
+            try:
+                with open(input_path, 'rb') as f:
+                    line = b''
+                    for line in f:
+                        current_fname = match_separator(line)
+                        if current_fname is not None:
+                            if fw is not None:
+                                fw.close()
+                            output_path = os.path.join(interimdir, current_fname)
+                            fw = open(output_path, 'wb')
+                            fw.write(header)
+                            log_with_level(6, "  %s", output_path)
+                            source_file_map[get_quadlet_service_filename(current_fname)] = input_path
+                        elif fw is not None:
+                            if line.endswith(b'\r\n'):
+                                line = line[:-2] + b'\n'
+                            fw.write(line)
+                    if fw is not None and not line.endswith(b'\n'):
+                        fw.write(b'\n')
+            finally:
+                if fw is not None:
+                    fw.close()
         except IOError as e:
-            log_with_level(3, f"Error: Cannot read input file '{input_path}', skipping: {e}")
+            log_with_level(3, "Error: Cannot read input file '%s', skipping: %s", input_path, e)
             continue
 
     
@@ -213,37 +364,61 @@ def main():
     interimdir_gen_late = os.path.join(interim_top_dir.name, "generator.late")
     try:
         podman_generator_path = f"/usr/lib/systemd/{systemd_scope}-generators/podman-{systemd_scope}-generator"
-        result = subprocess.run([podman_generator_path, interimdir_gen, interimdir_gen_early, interimdir_gen_late], env={**os.environ, 'QUADLET_UNIT_DIRS': interimdir}, check=True, capture_output=True, text=True)
-        log_with_level(6, f"Output of podman quadlet generator: \nSTDOUT: \n{result.stdout} \nSTDERR: \n{result.stderr}")
+        # The generator is the only child this process spawns, so set the variable in our own
+        # environment and let it be inherited rather than building a second copy for env=
+        os.environ['QUADLET_UNIT_DIRS'] = interimdir
+        generator_cmd = [podman_generator_path, interimdir_gen, interimdir_gen_early, interimdir_gen_late]
+        if _LOG_THRESHOLD >= 6:
+            # Let the kernel merge stdout and stderr into one file instead of draining two pipes
+            with tempfile.TemporaryFile() as output:
+                result = subprocess.run(generator_cmd, check=True, stdout=output, stderr=subprocess.STDOUT)
+                output.seek(0)
+                log_with_level(6, "Output of podman quadlet generator: \n%s", output.read().decode(errors='replace'))
+        else:
+            # The output would only be logged at level 6, so don't move it through userspace at all
+            result = subprocess.run(generator_cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
         if result.returncode != 0:
-            log_with_level(3, f"Error: podman generator failed with exit code {result.returncode}.")
+            log_with_level(3, "Error: podman generator failed with exit code %s.", result.returncode)
             sys.exit(result.returncode)
         else:
-            log_with_level(6, f"Podman generator completed successfuly.")
+            log_with_level(6, "Podman generator completed successfuly.")
     except FileNotFoundError:
-        log_with_level(3, f"Error: podman generator not found at '{podman_generator_path}'.")
+        log_with_level(3, "Error: podman generator not found at '%s'.", podman_generator_path)
         sys.exit(1)
     except Exception as e:
-        log_with_level(3, f"Error: unexpected error while running podman generator: {e}.")
+        log_with_level(3, "Error: unexpected error while running podman generator: %s.", e)
         sys.exit(1)
 
     # Fix up the SourcePath in the generated files
-    for fname in [f for f in os.listdir(interimdir_gen) if os.path.isfile(os.path.join(interimdir_gen, f))]:
-        update_source_path(os.path.join(interimdir_gen, fname), source_file_map[fname])
-    shutil.copytree(interimdir_gen, gendir, symlinks=True, dirs_exist_ok=True)
-
-    # Process and copy generated target files
-    for fname in os.listdir(interimdir):
-        if fname.endswith(('.target', '.socket', '.service', '.timer')):
-            dest_file = os.path.join(gendir, fname)
-            if not os.path.exists(dest_file):
-                update_source_path(os.path.join(interimdir, fname), source_file_map[fname])
-                log_with_level(6, f"Copying '{fname}' to '{gendir}'...")
-                shutil.copy(os.path.join(interimdir, fname), dest_file)
-                process_unit_install_section(gendir, fname)
+    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+        with os.scandir(interimdir_gen) as it:
+            generated_files = [entry.name for entry in it if entry.is_file()]
+        fixups = [executor.submit(update_source_path, os.path.join(interimdir_gen, fname), source_file_map[fname])
+                  for fname in generated_files]
+        for future in as_completed(fixups):
+            future.result()
+    copy_tree(interimdir_gen, gendir)
+
+    # Process and copy generated target files, each one touches only its own file and symlinks
+    with ThreadPoolExecutor(max_workers=_MAX_WORKERS) as executor:
+        # One listing of gendir instead of a stat per candidate
+        existing_files = set(os.listdir(gendir))
+        with os.scandir(interimdir) as it:
+            unit_files = [entry.name for entry in it if entry.name.endswith(_SYSTEMD_UNIT_EXTENSIONS) and entry.is_file()]
+        installs = {}
+        for fname in unit_files:
+            if fname not in existing_files:
+                installs[executor.submit(install_generated_unit, interimdir, gendir, fname, source_file_map[fname])] = fname
             else:
-                log_with_level(3, f"Error: {dest_file} already exists, skipping.")
-
+                log_with_level(3, "Error: %s already exists, skipping.", os.path.join(gendir, fname))
+        failed_units = []
+        for future in as_completed(installs):
+            if not future.result():
+                failed_units.append(installs[future])
+
+    if failed_units:
+        log_with_level(3, "Error: failed to install [Install] symlinks for: %s", ", ".join(sorted(failed_units)))
+        sys.exit(1)
     log_with_level(6, "Finished.")
 
 if __name__ == "__main__":